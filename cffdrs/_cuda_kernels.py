@@ -0,0 +1,105 @@
+# GPU versions of the kernels, imported only once ufunc_target() is 'cuda'
+#  so that importing cffdrs never has to load numba.cuda
+from numba import cuda
+
+import cffdrs._numba_kernels  # noqa: F401 registers the fwi.py calculations as jitable
+from cffdrs.fwi import (_bui_unchecked, _dc_unchecked, _dmc_unchecked, _ffmc_unchecked,
+                        _fwi_unchecked, _isi_unchecked)
+from cffdrs.hourly_fine_fuel_moisture_code import _hourly_fine_fuel_moisture_code_unchecked
+
+
+def _fwi_all_device(ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat, mon, lat_adjust,
+                    ffmc, dmc, dc, isi, bui, fwi):
+    # fwi_all_kernel with one GPU thread per pixel
+    i = cuda.grid(1)
+    if i < temp.shape[0]:
+        ffmc1 = _ffmc_unchecked(ffmc_yda[i], temp[i], rh[i], ws[i], prec[i])
+        dmc1 = _dmc_unchecked(dmc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+        dc1 = _dc_unchecked(dc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+        isi1 = _isi_unchecked(ffmc1, ws[i], False)
+        bui1 = _bui_unchecked(dmc1, dc1)
+        ffmc[i] = ffmc1
+        dmc[i] = dmc1
+        dc[i] = dc1
+        isi[i] = isi1
+        bui[i] = bui1
+        fwi[i] = _fwi_unchecked(isi1, bui1)
+
+
+def _hffmc_device(temp, rh, ws, prec, fo, t0, out):
+    # hourly_fine_fuel_moisture_code_arr with one GPU thread per station
+    i = cuda.grid(1)
+    if i < out.shape[0]:
+        out[i] = _hourly_fine_fuel_moisture_code_unchecked(temp[i], rh[i], ws[i], prec[i],
+                                                           fo[i], t0[i])
+
+
+fwi_all_device_kernel = cuda.jit(_fwi_all_device)
+hffmc_device_kernel = cuda.jit(_hffmc_device)
+
+
+def _device_map(kernel, inputs, args, outputs, threads=256):
+    # Run an elementwise kernel over flat host arrays, copying the inputs to
+    #  the GPU and the results back into outputs
+    blocks = (inputs[0].shape[0] + threads - 1) // threads
+    if not blocks:
+        return outputs
+    d_inputs = [cuda.to_device(a) for a in inputs]
+    d_outputs = [cuda.device_array_like(a) for a in outputs]
+    kernel[blocks, threads](*d_inputs, *args, *d_outputs)
+    for d_out, out in zip(d_outputs, outputs):
+        d_out.copy_to_host(out)
+    return outputs
+
+
+def device_fwi_all(inputs, mon, lat_adjust, outputs):
+    return _device_map(fwi_all_device_kernel, inputs, (mon, lat_adjust), outputs)
+
+
+def device_hffmc(inputs, out):
+    return _device_map(hffmc_device_kernel, inputs, (), [out])[0]
+
+
+def _ffmc_device(state, temp, rh, ws, prec):
+    # One day of ffmc_series_kernel, one GPU thread per pixel
+    i = cuda.grid(1)
+    if i < state.shape[0]:
+        state[i] = _ffmc_unchecked(state[i], temp[i], rh[i], ws[i], prec[i])
+
+
+def _dmc_device(state, temp, rh, prec, lat, mon, lat_adjust):
+    i = cuda.grid(1)
+    if i < state.shape[0]:
+        state[i] = _dmc_unchecked(state[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+
+
+def _dc_device(state, temp, rh, prec, lat, mon, lat_adjust):
+    i = cuda.grid(1)
+    if i < state.shape[0]:
+        state[i] = _dc_unchecked(state[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+
+
+ffmc_device_kernel = cuda.jit(_ffmc_device)
+dmc_device_kernel = cuda.jit(_dmc_device)
+dc_device_kernel = cuda.jit(_dc_device)
+
+
+def device_series(kernel, state0, daily, out, lat=None, mon=None, lat_adjust=True,
+                  threads=256):
+    # Iterate the days on the host with everything kept on the GPU: the daily
+    #  (days, pixels) inputs are copied over once, kernel updates the state in
+    #  place for each day, and all the days come back in one copy at the end.
+    #  dmc and dc kernels also take the per pixel lat and each day's mon.
+    blocks = (state0.shape[0] + threads - 1) // threads
+    if not blocks or not out.shape[0]:
+        return out
+    state = cuda.to_device(state0)
+    d_daily = [cuda.to_device(a) for a in daily]
+    d_lat = () if lat is None else (cuda.to_device(lat),)
+    d_out = cuda.device_array_like(out)
+    for t in range(out.shape[0]):
+        args = () if mon is None else (int(mon[t]), lat_adjust)
+        kernel[blocks, threads](state, *[a[t] for a in d_daily], *d_lat, *args)
+        d_out[t].copy_to_device(state)
+    d_out.copy_to_host(out)
+    return out
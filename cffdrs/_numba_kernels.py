@@ -0,0 +1,190 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from cffdrs.fwi import (_bui_unchecked, _dc_day_length, _dc_from_day_length, _dc_unchecked,
+                        _dmc_day_length, _dmc_from_day_length, _dmc_unchecked, _ffmc_unchecked,
+                        _fwi_unchecked, _isi_unchecked)
+from cffdrs.hourly_fine_fuel_moisture_code import _hourly_fine_fuel_moisture_code_unchecked
+
+try:
+    from numba import njit, prange, vectorize
+    from numba.extending import register_jitable
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional, the kernels then run as plain python
+    prange = range
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    def register_jitable(func):
+        return func
+
+# LLVM fast-math flags for the kernels. 'reassoc' is left out, since together
+#  with 'contract' it turns fm ** 5.31 at fm = 0 (FFMC 101) in isi() into NaN,
+#  and 'nnan' and 'ninf' are left out since NaN inputs such as nodata pixels
+#  pass validation and must propagate as in the plain python calculations
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn'}
+
+# Let compiled code, including the GPU kernels, call the fwi.py calculations
+#  and the day length lookups used by dmc() and dc()
+for _func in (_dmc_day_length, _dc_day_length, _dmc_from_day_length, _dc_from_day_length,
+              _ffmc_unchecked, _dmc_unchecked, _dc_unchecked, _isi_unchecked, _bui_unchecked,
+              _fwi_unchecked, _hourly_fine_fuel_moisture_code_unchecked):
+    register_jitable(_func)
+
+# The fwi.py calculations without their input validation, compiled for the
+#  kernels below; inputs are validated once by the callers of the kernels
+_ffmc_step = njit(fastmath=_FASTMATH, cache=True)(_ffmc_unchecked)
+_dmc_step = njit(fastmath=_FASTMATH, cache=True)(_dmc_unchecked)
+_dc_step = njit(fastmath=_FASTMATH, cache=True)(_dc_unchecked)
+_dmc_day_step = njit(fastmath=_FASTMATH, cache=True)(_dmc_from_day_length)
+_dc_day_step = njit(fastmath=_FASTMATH, cache=True)(_dc_from_day_length)
+_isi_step = njit(fastmath=_FASTMATH, cache=True)(_isi_unchecked)
+_bui_step = njit(fastmath=_FASTMATH, cache=True)(_bui_unchecked)
+_fwi_step = njit(fastmath=_FASTMATH, cache=True)(_fwi_unchecked)
+
+
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def ffmc_series_kernel(ffmc0, temp, rh, ws, prec, out):
+    n_days, n_pixels = temp.shape
+    for i in prange(n_pixels):
+        ffmc_yda = ffmc0[i]
+        for t in range(n_days):
+            ffmc_yda = _ffmc_step(ffmc_yda, temp[t, i], rh[t, i], ws[t, i], prec[t, i])
+            out[t, i] = ffmc_yda
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def dmc_series_kernel(dmc0, temp, rh, prec, zone, mon, day_lengths, out):
+    # The day length factor is gathered from the day_lengths[zone, month - 1]
+    #  table by each pixel's latitude zone, found once for the whole series
+    n_days, n_pixels = temp.shape
+    for i in prange(n_pixels):
+        dmc_yda = dmc0[i]
+        ell = day_lengths[zone[i]]
+        for t in range(n_days):
+            dmc_yda = _dmc_day_step(dmc_yda, temp[t, i], rh[t, i], prec[t, i], ell[mon[t] - 1])
+            out[t, i] = dmc_yda
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def dc_series_kernel(dc0, temp, rh, prec, zone, mon, day_lengths, out):
+    # Day length factors by latitude zone, see dmc_series_kernel
+    n_days, n_pixels = temp.shape
+    for i in prange(n_pixels):
+        dc_yda = dc0[i]
+        fl = day_lengths[zone[i]]
+        for t in range(n_days):
+            dc_yda = _dc_day_step(dc_yda, temp[t, i], rh[t, i], prec[t, i], fl[mon[t] - 1])
+            out[t, i] = dc_yda
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def fwi_all_kernel(ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat, mon, lat_adjust,
+                   ffmc, dmc, dc, isi, bui, fwi):
+    # FFMC first, with the pixels grouped by whether it rained so each loop
+    #  takes the same side of ffmc()'s rain branch throughout. A NaN prec
+    #  counts as dry, as in ffmc()
+    wet_mask = prec > 0.5
+    dry = np.nonzero(~wet_mask)[0]
+    wet = np.nonzero(wet_mask)[0]
+    for j in prange(dry.shape[0]):
+        i = dry[j]
+        ffmc[i] = _ffmc_step(ffmc_yda[i], temp[i], rh[i], ws[i], prec[i])
+    for j in prange(wet.shape[0]):
+        i = wet[j]
+        ffmc[i] = _ffmc_step(ffmc_yda[i], temp[i], rh[i], ws[i], prec[i])
+    # Then one pass over the pixels computing the other indices, so
+    #  intermediates stay in registers instead of round tripping through arrays
+    for i in prange(temp.shape[0]):
+        ffmc1 = ffmc[i]
+        dmc1 = _dmc_step(dmc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+        dc1 = _dc_step(dc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+        isi1 = _isi_step(ffmc1, ws[i], False)
+        bui1 = _bui_step(dmc1, dc1)
+        dmc[i] = dmc1
+        dc[i] = dc1
+        isi[i] = isi1
+        bui[i] = bui1
+        fwi[i] = _fwi_step(isi1, bui1)
+
+
+# Elementwise kernels behind the fwi_numpy.py array functions, over flat
+#  arrays of validated inputs
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def ffmc_arr_kernel(ffmc_yda, temp, rh, ws, prec, out):
+    for i in prange(out.shape[0]):
+        out[i] = _ffmc_step(ffmc_yda[i], temp[i], rh[i], ws[i], prec[i])
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def dmc_arr_kernel(dmc_yda, temp, rh, prec, lat, mon, lat_adjust, out):
+    for i in prange(out.shape[0]):
+        out[i] = _dmc_step(dmc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def dc_arr_kernel(dc_yda, temp, rh, prec, lat, mon, lat_adjust, out):
+    for i in prange(out.shape[0]):
+        out[i] = _dc_step(dc_yda[i], temp[i], rh[i], prec[i], lat[i], mon, lat_adjust)
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def isi_arr_kernel(ffmc, ws, fbp_mod, out):
+    for i in prange(out.shape[0]):
+        out[i] = _isi_step(ffmc[i], ws[i], fbp_mod)
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def bui_arr_kernel(dmc, dc, out):
+    for i in prange(out.shape[0]):
+        out[i] = _bui_step(dmc[i], dc[i])
+    return out
+
+
+@njit(parallel=True, fastmath=_FASTMATH, error_model='numpy', cache=True)
+def fwi_arr_kernel(isi, bui, out):
+    for i in prange(out.shape[0]):
+        out[i] = _fwi_step(isi[i], bui[i])
+    return out
+
+
+# Elementwise calculations built into ufuncs by get_ufunc() on first use
+#  rather than on import
+_UFUNCS = {
+    'hffmc': (['f8(f8, f8, f8, f8, f8, f8)'], _hourly_fine_fuel_moisture_code_unchecked),
+}
+
+
+def ufunc_target():
+    # Where the kernels run: 'cuda', i.e. the _cuda_kernels.py kernels, only
+    #  when asked for with the CFFDRS_TARGET=cuda environment variable, since
+    #  looking for a GPU and compiling for it take seconds, and 'parallel',
+    #  the multithreaded CPU kernels, otherwise. None without numba.
+    if not HAVE_NUMBA:
+        return None
+    return 'cuda' if os.environ.get('CFFDRS_TARGET', '').lower() == 'cuda' else 'parallel'
+
+
+@lru_cache(maxsize=None)
+def get_ufunc(name):
+    # The named ufunc of _UFUNCS, multithreaded on the CPU; GPU versions are
+    #  cuda.jit kernels in _cuda_kernels.py
+    signatures, func = _UFUNCS[name]
+    if not HAVE_NUMBA:
+        return np.vectorize(func, otypes=[np.float64])
+    return vectorize(signatures, target='parallel', fastmath=_FASTMATH, cache=True)(func)
@@ -0,0 +1,121 @@
+import numpy as np
+
+from cffdrs._numba_kernels import HAVE_NUMBA, bui_arr_kernel
+
+# Pixels per block, few enough that a block's temporaries stay in cache
+#  between the chained operations
+_TILE = 16384
+
+
+def _float_dtype(*arrays):
+    # float32 when every array input fits in it exactly, i.e. float32 or
+    #  integers of up to 16 bits as often stored in rasters, so large rasters
+    #  keep half the memory traffic; float64 otherwise, including for python
+    #  scalars. This is the float type NumPy's own ufuncs would compute in.
+    dtypes = [a.dtype for a in arrays if hasattr(a, 'dtype')]
+    if dtypes and np.result_type(*dtypes, np.float16).itemsize <= 4:
+        return np.float32
+    return np.float64
+
+
+def _check_range(name, arr, lo, hi=np.inf):
+    # min() and max() reductions avoid building boolean temporaries for
+    #  valid inputs; the offending value is only looked up on failure. Both
+    #  are NaN once any pixel is, e.g. nodata, so the NaN-skipping fmin and
+    #  fmax reductions then check the remaining pixels.
+    if not arr.size:
+        return
+    low, high = arr.min(), arr.max()
+    if low != low:
+        low, high = np.fmin.reduce(arr, axis=None), np.fmax.reduce(arr, axis=None)
+    if low < lo or high > hi:
+        raise ValueError(f'Invalid {name}: {arr[(arr < lo) | (arr > hi)].flat[0]}')
+
+
+def _check_out(out, shape, dtype):
+    if out.shape != shape or out.dtype != dtype or not out.flags['C_CONTIGUOUS']:
+        raise ValueError(f'Invalid out: needs C-contiguous {dtype} of shape {shape}')
+
+
+def buildup_index(dc, dmc, out=None):
+    """
+    Buildup Index Calculation for rasters
+
+    Parameters
+    ----------
+    dc : array_like
+       Drought Code
+    dmc : array_like
+       Duff Moisture Code
+    out : numpy.ndarray, optional
+       Preallocated C-contiguous array of the result's shape and dtype to
+       write into, e.g. a numpy.memmap for rasters too large for memory
+
+    Returns
+    -------
+    numpy.ndarray
+        Buildup Index, float32 for float32 or up to 16 bit integer inputs
+        and float64 otherwise
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.bui`, with the piecewise branches
+    computed in place on one output array, with the second branch only
+    evaluated and written for the pixels that take it. Large rasters are
+    processed in blocks small enough to stay in cache. When numba is
+    installed, a compiled loop over the pixels, run on multiple threads, is
+    used instead.
+
+    Equations and FORTRAN program for the Canadian Forest Fire
+    Weather Index System. 1985. Van Wagner, C.E.; Pickett, T.L.
+    Canadian Forestry Service, Petawawa National Forestry
+    Institute, Chalk River, Ontario. Forestry Technical Report 33.
+    18 p.
+    """
+    dtype = _float_dtype(dc, dmc)
+    dc, dmc = np.broadcast_arrays(np.asarray(dc, dtype=dtype), np.asarray(dmc, dtype=dtype))
+    _check_range('dmc', dmc, 0)
+    _check_range('dc', dc, 0)
+    # work on 1-d arrays so that in-place and masked operations also apply
+    #  to scalar inputs
+    shape = dmc.shape
+    dc, dmc = dc.reshape(-1), dmc.reshape(-1)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    _check_out(out, shape, dtype)
+    bui = out.reshape(-1)
+    if HAVE_NUMBA:
+        bui_arr_kernel(np.ascontiguousarray(dmc), np.ascontiguousarray(dc), bui)
+        return out
+    # the blocks below overwrite bui before they are done reading the inputs
+    if np.may_share_memory(bui, dc) or np.may_share_memory(bui, dmc):
+        dc, dmc = dc.copy(), dmc.copy()
+    for start in range(0, bui.shape[0], _TILE):
+        s = slice(start, start + _TILE)
+        _buildup_index_block(dc[s], dmc[s], bui[s])
+    return out
+
+
+def _buildup_index_block(dc, dmc, bui):
+    # buildup_index() of 1-d dc and dmc, written into bui
+    # Eq. 27a - the denominator is only 0 when both dmc and dc are 0,
+    #  in which case the numerator is already 0, so bounding it below by a
+    #  tiny value avoids a masked divide
+    np.multiply(dc, dmc, out=bui)
+    bui *= 0.8
+    denom = dmc + 0.4 * dc
+    np.maximum(denom, np.finfo(bui.dtype).tiny, out=denom)
+    bui /= denom
+    # Eq. 27b - next 3 lines, only where bui1 < dmc, so dmc > 0 there
+    m = bui < dmc
+    dmc_m = dmc[m]
+    p = dmc_m - bui[m]
+    p /= dmc_m
+    cc = np.multiply(dmc_m, 0.0114)
+    np.power(cc, 1.7, out=cc)
+    cc += 0.92
+    cc *= p
+    np.subtract(dmc_m, cc, out=cc)
+    # Constraints
+    np.maximum(cc, 0, out=cc)
+    bui[m] = cc
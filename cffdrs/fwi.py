@@ -1,7 +1,111 @@
-from math import exp, log, sqrt
+from math import exp, expm1, log, log1p, sqrt
 
 # used in conversion between FFMC and moisture content
 FFMC_COEFFICIENT = 250.0 * 59.5 / 101.0
+# natural log of 10, so 10 ** x can be evaluated as exp(x * _LN10)
+_LN10 = 2.302585092994046
+
+# The _*_unchecked calculations below take the math functions as default
+#  arguments, so plain CPython reads them as locals instead of looking up
+#  module globals on every call; numba compiles them the same either way
+
+# Reference latitude for DMC day length adjustment, indexed by [zone][month - 1]
+_ELL = (
+    # 46N: Canadian standard, latitude >= 30N   (Van Wagner 1987)
+    (6.5, 7.5, 9.0, 12.8, 13.9, 13.9, 12.4, 10.9, 9.4, 8.0, 7.0, 6.0),
+    # 20N: For 30 > latitude >= 10
+    (7.9, 8.4, 8.9, 9.5, 9.9, 10.2, 10.1, 9.7, 9.1, 8.6, 8.1, 7.8),
+    # 20S: For -10 > latitude >= -30
+    (10.1, 9.6, 9.1, 8.5, 8.1, 7.8, 7.9, 8.3, 8.9, 9.4, 9.9, 10.2),
+    # 40S: For -30 > latitude
+    (11.5, 10.5, 9.2, 7.9, 6.8, 6.2, 6.5, 7.4, 8.7, 10.0, 11.2, 11.8),
+)
+# Day length factor for DC Calculations, indexed by [zone][month - 1]
+_FL = (
+    # 20N: North of 20 degrees N
+    (-1.6, -1.6, -1.6, 0.9, 3.8, 5.8, 6.4, 5.0, 2.4, 0.4, -1.6, -1.6),
+    # 20S: South of 20 degrees S
+    (6.4, 5.0, 2.4, 0.4, -1.6, -1.6, -1.6, -1.6, -1.6, 0.9, 3.8, 5.8),
+)
+
+
+def _dmc_day_length(lat, mon, lat_adjust):
+    # The Canadian standard is the fall-through, so it also applies to a NaN
+    #  lat or one outside [-90, 30]
+    if lat_adjust:
+        if 30 >= lat > 10:
+            return _ELL[1][mon - 1]
+        # For latitude near the equator, we simply use a factor of 9 for all months
+        if 10 >= lat > -10:
+            return 9.0
+        if -10 >= lat > -30:
+            return _ELL[2][mon - 1]
+        if -30 >= lat >= -90:
+            return _ELL[3][mon - 1]
+    return _ELL[0][mon - 1]
+
+
+def _dc_day_length(lat, mon, lat_adjust):
+    # The northern factors are the fall-through, as for _dmc_day_length
+    if lat_adjust:
+        if lat <= -20:
+            return _FL[1][mon - 1]
+        # Near the equator, we just use 1.4 for all months.
+        if -20 < lat <= 20:
+            return 1.4
+    return _FL[0][mon - 1]
+
+
+def _ffmc_unchecked(ffmc_yda, temp, rh, ws, prec, _exp=exp, _expm1=expm1, _log=log,
+                    _sqrt=sqrt):
+    # ffmc() without input validation, for callers that validate up front
+    # Eq. 1
+    wmo = FFMC_COEFFICIENT * (101 - ffmc_yda) / (59.5 + ffmc_yda)
+    # Eq. 2 Rain reduction to allow for loss in
+    #  overhead canopy
+    ra = (prec - 0.5) if (prec > 0.5) else prec
+    # Eqs. 3a and 3b
+    if prec > 0.5:
+        rain = 42.5 * ra * _exp(-100 / (251 - wmo)) * -_expm1(-6.93 / ra)
+        wmo = ((wmo + 0.0015 * (wmo - 150) * (wmo - 150) * _sqrt(ra) + rain) if (wmo > 150) else
+               (wmo + rain))
+    # The real moisture content of pine litter ranges up to about 250 percent,
+    # so we cap it at 250
+    wmo = 250 if (wmo > 250) else wmo
+    # rh ** 0.679 and rh ** 0.753 share one log of rh (floored so rh = 0
+    #  still gives powers of 0)
+    log_rh = _log(max(rh, 1e-300))
+    # Terms shared by Eqs. 4 and 5
+    rh_term = _exp((rh - 100) / 10)
+    temp_term = 0.18 * (21.1 - temp) * -_expm1(-0.115 * rh)
+    # Eq. 4 Equilibrium moisture content from drying
+    ed = 0.942 * _exp(0.679 * log_rh) + (11 * rh_term) + temp_term
+    # Eq. 5 Equilibrium moisture content from wetting
+    ew = 0.618 * _exp(0.753 * log_rh) + (10 * rh_term) + temp_term
+    # Temperature effect shared by Eqs. 6b and 7b
+    temp_effect = _exp(0.0365 * temp)
+    # Eq. 6a (ko) Log drying rate at the normal
+    #  termperature of 21.1 C
+    z = (0.424 * (1 - (((100 - rh) / 100) ** 1.7)) + 0.0694 *
+         _sqrt(ws) * (1 - ((100 - rh) / 100) ** 8)) if (wmo < ed and wmo < ew) else 0
+    # Eq. 6b Affect of temperature on  drying rate
+    x = z * 0.581 * temp_effect
+    # Eq. 8
+    wm = (ew - (ew - wmo) / _exp(x * _LN10)) if (wmo < ed and wmo < ew) else wmo
+    # Eq. 7a (ko) Log wetting rate at the normal
+    #  termperature of 21.1 C
+    z = (0.424 * (1 - (rh / 100) ** 1.7) + 0.0694 * _sqrt(ws) *
+         (1 - (rh / 100) ** 8)) if (wmo > ed) else z
+    # Eq. 7b Affect of temperature on  wetting rate
+    x = z * 0.581 * temp_effect
+    # Eq. 9
+    wm = (ed + (wmo - ed) / _exp(x * _LN10)) if (wmo > ed) else wm
+    # Eq. 10 Final ffmc calculation
+    ffmc1 = (59.5 * (250 - wm)) / (FFMC_COEFFICIENT + wm)
+    # Constraints
+    ffmc1 = 101 if (ffmc1 > 101) else ffmc1
+    ffmc1 = 0 if (ffmc1 < 0) else ffmc1
+    return ffmc1
 
 
 def ffmc(ffmc_yda, temp, rh, ws, prec):
@@ -53,48 +157,43 @@ def ffmc(ffmc_yda, temp, rh, ws, prec):
         raise ValueError(f'Invalid prec: {prec}')
     if ws < 0:
         raise ValueError(f'Invalid ws: {ws}')
-    # Eq. 1
-    wmo = FFMC_COEFFICIENT * (101 - ffmc_yda) / (59.5 + ffmc_yda)
-    # Eq. 2 Rain reduction to allow for loss in
-    #  overhead canopy
-    ra = (prec - 0.5) if (prec > 0.5) else prec
-    # Eqs. 3a and 3b
-    wmo = ((wmo + 0.0015 * (wmo - 150) * (wmo - 150) *
-            sqrt(ra) + 42.5 * ra * exp(-100 / (251 - wmo))
-            * (1 - exp(-6.93 / ra))) if (wmo > 150) else
-           (wmo + 42.5 * ra * exp(-100 / (251 - wmo)) *
-            (1 - exp(-6.93 / ra)))) if (prec > 0.5) else wmo
-    # The real moisture content of pine litter ranges up to about 250 percent,
-    # so we cap it at 250
-    wmo = 250 if (wmo > 250) else wmo
-    # Eq. 4 Equilibrium moisture content from drying
-    ed = (0.942 * (rh ** 0.679) + (11 * exp((rh - 100) / 10)) + 0.18 *
-          (21.1 - temp) * (1 - 1 / exp(rh * 0.115)))
-    # Eq. 5 Equilibrium moisture content from wetting
-    ew = (0.618 * (rh ** 0.753) + (10 * exp((rh - 100) / 10)) + 0.18 *
-          (21.1 - temp) * (1 - 1 / exp(rh * 0.115)))
-    # Eq. 6a (ko) Log drying rate at the normal
-    #  termperature of 21.1 C
-    z = (0.424 * (1 - (((100 - rh) / 100) ** 1.7)) + 0.0694 *
-         sqrt(ws) * (1 - ((100 - rh) / 100) ** 8)) if (wmo < ed and wmo < ew) else 0
-    # Eq. 6b Affect of temperature on  drying rate
-    x = z * 0.581 * exp(0.0365 * temp)
-    # Eq. 8
-    wm = (ew - (ew - wmo) / (10 ** x)) if (wmo < ed and wmo < ew) else wmo
-    # Eq. 7a (ko) Log wetting rate at the normal
-    #  termperature of 21.1 C
-    z = (0.424 * (1 - (rh / 100) ** 1.7) + 0.0694 * sqrt(ws) *
-         (1 - (rh / 100) ** 8)) if (wmo > ed) else z
-    # Eq. 7b Affect of temperature on  wetting rate
-    x = z * 0.581 * exp(0.0365 * temp)
-    # Eq. 9
-    wm = (ed + (wmo - ed) / (10 ** x)) if (wmo > ed) else wm
-    # Eq. 10 Final ffmc calculation
-    ffmc1 = (59.5 * (250 - wm)) / (FFMC_COEFFICIENT + wm)
-    # Constraints
-    ffmc1 = 101 if (ffmc1 > 101) else ffmc1
-    ffmc1 = 0 if (ffmc1 < 0) else ffmc1
-    return ffmc1
+    return _ffmc_unchecked(ffmc_yda, temp, rh, ws, prec)
+
+
+def _dmc_from_day_length(dmc_yda, temp, rh, prec, ell, _exp=exp, _log=log):
+    # dmc() without input validation, given the day length factor ell
+    # constrain low end of temperature
+    temp = max(temp, -1.1)
+    # Eq. 16 - The log drying rate
+    rk = 1.894 * (temp + 1.1) * (100 - rh) * ell * 1e-04
+    # Constrain P
+    if prec <= 1.5:
+        pr = dmc_yda
+    else:
+        ra = prec
+        # Eq. 11 - Net rain amount
+        rw = 0.92 * ra - 1.27
+        # Alteration to Eq. 12 to calculate more accurately
+        wmi = 20 + 280 / _exp(0.023 * dmc_yda)
+        # Eqs. 13a, 13b, 13c
+        b = (100 / (0.5 + 0.3 * dmc_yda)) if (dmc_yda <= 33) else (
+            (14 - 1.3 * _log(dmc_yda)) if (dmc_yda <= 65) else
+            (6.2 * _log(dmc_yda) - 17.2))
+        # Eq. 14 - Moisture content after rain
+        wmr = wmi + 1000 * rw / (48.77 + b * rw)
+        # Alteration to Eq. 15 to calculate more accurately
+        pr = 43.43 * (5.6348 - _log(wmr - 20))
+    pr = 0 if (pr < 0) else pr
+    # Calculate final P (DMC)
+    dmc1 = pr + rk
+    dmc1 = 0 if (dmc1 < 0) else dmc1
+    return dmc1
+
+
+def _dmc_unchecked(dmc_yda, temp, rh, prec, lat, mon, lat_adjust):
+    # dmc() without input validation, for callers that validate up front,
+    #  with the day length adjusted based on latitude and month
+    return _dmc_from_day_length(dmc_yda, temp, rh, prec, _dmc_day_length(lat, mon, lat_adjust))
 
 
 def dmc(dmc_yda, temp, rh, prec, lat, mon, lat_adjust=True):
@@ -150,48 +249,39 @@ def dmc(dmc_yda, temp, rh, prec, lat, mon, lat_adjust=True):
         raise ValueError(f'Invalid prec: {prec}')
     if mon < 1 or mon > 12 or not isinstance(mon, int):
         raise ValueError(f'Invalid mon: {mon}')
-    # Reference latitude for DMC day length adjustment
-    # 46N: Canadian standard, latitude >= 30N   (Van Wagner 1987)
-    ell01 = [6.5, 7.5, 9, 12.8, 13.9, 13.9, 12.4, 10.9, 9.4, 8, 7, 6]
-    # 20N: For 30 > latitude >= 10
-    ell02 = [7.9, 8.4, 8.9, 9.5, 9.9, 10.2, 10.1, 9.7, 9.1, 8.6, 8.1, 7.8]
-    # 20S: For -10 > latitude >= -30
-    ell03 = [10.1, 9.6, 9.1, 8.5, 8.1, 7.8, 7.9, 8.3, 8.9, 9.4, 9.9, 10.2]
-    # 40S: For -30 > latitude
-    ell04 = [11.5, 10.5, 9.2, 7.9, 6.8, 6.2, 6.5, 7.4, 8.7, 10, 11.2, 11.8]
-    # For latitude near the equator, we simple use a factor of 9 for all months
-    # constrain low end of temperature
-    temp = -1.1 if (temp < 1.1) else temp
-    # Eq. 16 - The log drying rate
-    rk = 1.894 * (temp + 1.1) * (100 - rh) * ell01[mon - 1] * 1e-04
-    # Adjust the day length  and thus the drying r, based on latitude and month
-    if lat_adjust:
-        rk = (1.894 * (temp + 1.1) * (100 - rh) * ell02[mon - 1] * 1e-04) if (30 >= lat > 10) else rk
-        rk = (1.894 * (temp + 1.1) * (100 - rh) * ell03[mon - 1] * 1e-04) if (-10 >= lat > -30) else rk
-        rk = (1.894 * (temp + 1.1) * (100 - rh) * ell04[mon - 1] * 1e-04) if (-30 >= lat >= -90) else rk
-        rk = (1.894 * (temp + 1.1) * (100 - rh) * 9 * 1e-04) if (10 >= lat > -10) else rk
-    # Constrain P
-    if prec <= 1.5:
-        pr = dmc_yda
-    else:
+    return _dmc_unchecked(dmc_yda, temp, rh, prec, lat, mon, lat_adjust)
+
+
+def _dc_from_day_length(dc_yda, temp, rh, prec, fl, _exp=exp, _log1p=log1p):
+    # dc() without input validation, given the day length factor fl
+    # Constrain temperature
+    temp = max(temp, -2.8)
+    # Eq. 22 - Potential Evapotranspiration
+    pe = (0.36 * (temp + 2.8) + fl) / 2
+    # Cap potential evapotranspiration at 0 for negative winter DC values
+    pe = 0 if (pe < 0) else pe
+    # if precip is less than 2.8 then use yesterday's DC, skipping the
+    #  rain terms, which are also out of the domain of log() for high DC
+    dr = dc_yda
+    if prec > 2.8:
         ra = prec
-        # Eq. 11 - Net rain amount
-        rw = 0.92 * ra - 1.27
-        # Alteration to Eq. 12 to calculate more accurately
-        wmi = 20 + 280 / exp(0.023 * dmc_yda)
-        # Eqs. 13a, 13b, 13c
-        b = (100 / (0.5 + 0.3 * dmc_yda)) if (dmc_yda <= 33) else (
-            (14 - 1.3 * log(dmc_yda)) if (dmc_yda <= 65) else
-            (6.2 * log(dmc_yda) - 17.2))
-        # Eq. 14 - Moisture content after rain
-        wmr = wmi + 1000 * rw / (48.77 + b * rw)
-        # Alteration to Eq. 15 to calculate more accurately
-        pr = 43.43 * (5.6348 - log(wmr - 20))
-    pr = 0 if (pr < 0) else pr
-    # Calculate final P (DMC)
-    dmc1 = pr + rk
-    dmc1 = 0 if (dmc1 < 0) else dmc1
-    return dmc1
+        # Eq. 18 - Effective Rainfall
+        rw = 0.83 * ra - 1.27
+        # Eq. 19
+        smi = 800 * _exp(-dc_yda / 400)
+        # Alteration to Eq. 21
+        dr = dc_yda - 400 * _log1p(3.937 * rw / smi)
+        dr = 0 if (dr < 0) else dr
+    # Alteration to Eq. 23
+    dc1 = dr + pe
+    dc1 = 0 if (dc1 < 0) else dc1
+    return dc1
+
+
+def _dc_unchecked(dc_yda, temp, rh, prec, lat, mon, lat_adjust):
+    # dc() without input validation, for callers that validate up front,
+    #  with the day length factor adjusted by latitude
+    return _dc_from_day_length(dc_yda, temp, rh, prec, _dc_day_length(lat, mon, lat_adjust))
 
 
 def dc(dc_yda, temp, rh, prec, lat, mon, lat_adjust=True):
@@ -247,36 +337,22 @@ def dc(dc_yda, temp, rh, prec, lat, mon, lat_adjust=True):
         raise ValueError(f'Invalid prec: {prec}')
     if mon < 1 or mon > 12 or not isinstance(mon, int):
         raise ValueError(f'Invalid mon: {mon}')
-    # Day length factor for DC Calculations
-    # 20N: North of 20 degrees N
-    fl01 = [-1.6, -1.6, -1.6, 0.9, 3.8, 5.8, 6.4, 5, 2.4, 0.4, -1.6, -1.6]
-    # 20S: South of 20 degrees S
-    fl02 = [6.4, 5, 2.4, 0.4, -1.6, -1.6, -1.6, -1.6, -1.6, 0.9, 3.8, 5.8]
-    # Near the equator, we just use 1.4 for all months.
-    # Constrain temperature
-    temp = -2.8 if (temp < 2.8) else temp
-    # Eq. 22 - Potential Evapotranspiration
-    pe = (0.36 * (temp + 2.8) + fl01[mon - 1]) / 2
-    # Daylength factor adjustment by latitude for Potential Evapotranspiration
-    if lat_adjust:
-        pe = ((0.36 * (temp + 2.8) + fl02[mon - 1]) / 2) if (lat <= -20) else pe
-        pe = ((0.36 * (temp + 2.8) + 1.4) / 2) if (-20 < lat <= 20) else pe
-    # Cap potential evapotranspiration at 0 for negative winter DC values
-    pe = 0 if (pe < 0) else pe
-    ra = prec
-    # Eq. 18 - Effective Rainfall
-    rw = 0.83 * ra - 1.27
-    # Eq. 19
-    smi = 800 * exp(-1 * dc_yda / 400)
-    # Alteration to Eq. 21
-    dr0 = dc_yda - 400 * log(1 + 3.937 * rw / smi)
-    dr0 = 0 if (dr0 < 0) else dr0
-    # if precip is less than 2.8 then use yesterday's DC
-    dr = dc_yda if (prec <= 2.8) else dr0
-    # Alteration to Eq. 23
-    dc1 = dr + pe
-    dc1 = 0 if (dc1 < 0) else dc1
-    return dc1
+    return _dc_unchecked(dc_yda, temp, rh, prec, lat, mon, lat_adjust)
+
+
+def _isi_unchecked(ffmc, ws, fbp_mod, _exp=exp, _expm1=expm1):
+    # isi() without input validation, for callers that validate up front
+    # Eq. 10 - Moisture content
+    fm = FFMC_COEFFICIENT * (101 - ffmc) / (59.5 + ffmc)
+    # Eq. 24 - Wind Effect
+    # the ifelse, also takes care of the ISI modification for the fbp functions
+    # This modification is Equation 53a in FCFDG (1992)
+    fW = (-12 * _expm1(-0.0818 * (ws - 28))) if (ws >= 40 and fbp_mod) else _exp(0.05039 * ws)
+    # Eq. 25 - Fine Fuel Moisture
+    fF = 91.9 * _exp(-0.1386 * fm) * (1 + (fm ** 5.31) / 49300000)
+    # Eq. 26 - Spread Index Equation
+    isi = 0.208 * fW * fF
+    return isi
 
 
 def isi(ffmc, ws, fbp_mod=False):
@@ -316,17 +392,23 @@ def isi(ffmc, ws, fbp_mod=False):
         raise ValueError(f'Invalid ffmc: {ffmc}')
     if ws < 0:
         raise ValueError(f'Invalid ws: {ws}')
-    # Eq. 10 - Moisture content
-    fm = FFMC_COEFFICIENT * (101 - ffmc) / (59.5 + ffmc)
-    # Eq. 24 - Wind Effect
-    # the ifelse, also takes care of the ISI modification for the fbp functions
-    # This modification is Equation 53a in FCFDG (1992)
-    fW = (12 * (1 - exp(-0.0818 * (ws - 28)))) if (ws >= 40 and fbp_mod) else exp(0.05039 * ws)
-    # Eq. 25 - Fine Fuel Moisture
-    fF = 91.9 * exp(-0.1386 * fm) * (1 + (fm ** 5.31) / 49300000)
-    # Eq. 26 - Spread Index Equation
-    isi = 0.208 * fW * fF
-    return isi
+    return _isi_unchecked(ffmc, ws, fbp_mod)
+
+
+def _bui_unchecked(dmc, dc):
+    # bui() without input validation, for callers that validate up front
+    # Eq. 27a - the denominator is only 0 when both dmc and dc are 0, where
+    #  the numerator is 0 too, so a tiny lower bound gives 0 without a branch
+    bui1 = 0.8 * dc * dmc / max(dmc + 0.4 * dc, 1e-300)
+    # Eq. 27b - next 3 lines
+    # dmc - bui1 is 0 wherever dmc is 0, so p is 0 there too
+    p = (dmc - bui1) / max(dmc, 1e-300)
+    cc = 0.92 + ((0.0114 * dmc) ** 1.7)
+    bui0 = dmc - cc * p
+    # Constraints
+    bui0 = 0 if (bui0 < 0) else bui0
+    bui1 = bui0 if (bui1 < dmc) else bui1
+    return bui1
 
 
 def bui(dmc, dc):
@@ -368,16 +450,17 @@ def bui(dmc, dc):
         raise ValueError(f'Invalid dmc: {dmc}')
     if dc < 0:
         raise ValueError(f'Invalid dc: {dc}')
-    # Eq. 27a
-    bui1 = 0 if (dmc == 0 and dc == 0) else (0.8 * dc * dmc / (dmc + 0.4 * dc))
-    # Eq. 27b - next 3 lines
-    p = 0 if (dmc == 0) else ((dmc - bui1) / dmc)
-    cc = 0.92 + ((0.0114 * dmc) ** 1.7)
-    bui0 = dmc - cc * p
-    # Constraints
-    bui0 = 0 if (bui0 < 0) else bui0
-    bui1 = bui0 if (bui1 < dmc) else bui1
-    return bui1
+    return _bui_unchecked(dmc, dc)
+
+
+def _fwi_unchecked(isi, bui, _exp=exp, _log=log):
+    # fwi() without input validation, for callers that validate up front
+    # Eqs. 28b, 28a, 29
+    bb = (0.1 * isi * (1000 / (25 + 108.64 / _exp(0.023 * bui)))) if (
+            bui > 80) else (0.1 * isi * (0.626 * (bui ** 0.809) + 2))
+    # Eqs. 30b, 30a
+    fwi = bb if (bb <= 1.0) else _exp(2.72 * ((0.434 * _log(bb)) ** 0.647))
+    return fwi
 
 
 def fwi(isi, bui):
@@ -419,9 +502,4 @@ def fwi(isi, bui):
         raise ValueError(f'Invalid isi: {isi}')
     if bui < 0:
         raise ValueError(f'Invalid bui: {bui}')
-    # Eqs. 28b, 28a, 29
-    bb = (0.1 * isi * (1000 / (25 + 108.64 / exp(0.023 * bui)))) if (
-            bui > 80) else (0.1 * isi * (0.626 * (bui ** 0.809) + 2))
-    # Eqs. 30b, 30a
-    fwi = bb if (bb <= 1.0) else exp(2.72 * ((0.434 * log(bb)) ** 0.647))
-    return fwi
+    return _fwi_unchecked(isi, bui)
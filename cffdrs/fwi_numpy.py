@@ -0,0 +1,498 @@
+import numpy as np
+
+from cffdrs._numba_kernels import (HAVE_NUMBA, dc_arr_kernel, dmc_arr_kernel, ffmc_arr_kernel,
+                                   fwi_arr_kernel, get_ufunc, isi_arr_kernel, ufunc_target)
+from cffdrs.buildup_index_raster import _check_out, _check_range, _float_dtype, buildup_index
+from cffdrs.fwi import FFMC_COEFFICIENT, _ELL, _FL, _LN10, _dc_day_length, _dmc_day_length
+
+# Day length factors of fwi.py indexed by [zone][month - 1], with the zones
+#  running south to north, including the constant near-equator factors and
+#  DMC's fallback to the first factors south of -90
+_DMC_DAY_LENGTHS = np.array([_ELL[0], _ELL[3], _ELL[2], (9.0,) * 12, _ELL[1], _ELL[0]])
+_DC_DAY_LENGTHS = np.array([_FL[1], (1.4,) * 12, _FL[0]])
+# Southern edges of the zones above the first; a zone's upper edge belongs
+#  to it, as in cffdrs.fwi._dmc_day_length and _dc_day_length
+_DMC_LAT_EDGES = np.array([np.nextafter(-90.0, -np.inf), -30.0, -10.0, 10.0, 30.0])
+_DC_LAT_EDGES = np.array([-20.0, 20.0])
+
+
+def _as_arrays(*arrays):
+    dtype = _float_dtype(*arrays)
+    return np.broadcast_arrays(*[np.asarray(a, dtype=dtype) for a in arrays])
+
+
+def _dmc_zones(lat, lat_adjust):
+    # rows of _DMC_DAY_LENGTHS for each lat, found with one binary search
+    #  through the zone edges rather than a pass per zone
+    if not lat_adjust:
+        return np.full(np.shape(lat), _DMC_DAY_LENGTHS.shape[0] - 1, dtype=np.intp)
+    return np.searchsorted(_DMC_LAT_EDGES, lat)
+
+
+def _dc_zones(lat, lat_adjust):
+    # rows of _DC_DAY_LENGTHS for each lat, see _dmc_zones
+    if not lat_adjust:
+        return np.full(np.shape(lat), _DC_DAY_LENGTHS.shape[0] - 1, dtype=np.intp)
+    return np.searchsorted(_DC_LAT_EDGES, lat)
+
+
+def _check_mon(mon):
+    if mon < 1 or mon > 12 or not isinstance(mon, (int, np.integer)):
+        raise ValueError(f'Invalid mon: {mon}')
+
+
+def _flatten(*arrays):
+    # 1-d versions of the broadcast arrays, so that masked assignment also
+    #  works for scalar inputs; results are reshaped back to the input shape
+    return arrays[0].shape, [a.reshape(-1) for a in arrays]
+
+
+def _pow8(y):
+    # y ** 8 as three squarings rather than a general power
+    y = y * y
+    y *= y
+    y *= y
+    return y
+
+
+def _run_kernel(kernel, arrays, *args, out=None):
+    # run a compiled elementwise kernel over the flattened, validated arrays,
+    #  writing into out if given
+    shape, dtype = arrays[0].shape, arrays[0].dtype
+    arrays = [np.ascontiguousarray(a).reshape(-1) for a in arrays]
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    _check_out(out, shape, dtype)
+    kernel(*arrays, *args, out.reshape(-1))
+    return out
+
+
+def _store(result, out):
+    # copy the result of a NumPy body into out if given
+    if out is None:
+        return result
+    _check_out(out, result.shape, result.dtype)
+    out[...] = result
+    return out
+
+
+def ffmc_arr(ffmc_yda, temp, rh, ws, prec, out=None):
+    """
+    Fine Fuel Moisture Code Calculation for arrays
+
+    Parameters
+    ----------
+    ffmc_yda : array_like
+        The Fine Fuel Moisture Code from previous iteration
+    temp : array_like
+        Temperature (centigrade)
+    rh : array_like
+        Relative Humidity (%)
+    ws : array_like
+        Wind speed (km/h)
+    prec : array_like
+        Precipitation (mm)
+    out : numpy.ndarray, optional
+        Preallocated C-contiguous array of the result's shape and dtype to
+        write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Fine Fuel Moisture Code
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.ffmc`, where every equation is a
+    whole-array NumPy operation so exp/log/power run in NumPy's vectorized
+    loops. Branches are evaluated only on the elements that take them, and
+    written into the result through boolean masks.
+
+    When numba is installed the inputs are still validated as arrays, but
+    the calculation runs as a single compiled loop over the elements
+    instead, so no intermediate arrays are allocated.
+
+    Like the other array functions, float32 inputs, or integer rasters of
+    up to 16 bits, are computed and returned as float32, halving the memory
+    traffic on large rasters; all other inputs give float64.
+    """
+    ffmc_yda, temp, rh, ws, prec = _as_arrays(ffmc_yda, temp, rh, ws, prec)
+    _check_range('ffmc_yda', ffmc_yda, 0, 101)
+    _check_range('rh', rh, 0, 100)
+    _check_range('prec', prec, 0)
+    _check_range('ws', ws, 0)
+    if HAVE_NUMBA:
+        return _run_kernel(ffmc_arr_kernel, (ffmc_yda, temp, rh, ws, prec), out=out)
+    return _store(_ffmc_moisture(ffmc_yda, temp, rh, ws, prec)[0], out)
+
+
+def _ffmc_moisture(ffmc_yda, temp, rh, ws, prec):
+    # NumPy body of ffmc_arr, also returning the final moisture content,
+    #  which is the Eq. 10 moisture content isi_arr would derive from the FFMC
+    shape, (ffmc_yda, temp, rh, ws, prec) = _flatten(ffmc_yda, temp, rh, ws, prec)
+    # Eq. 1
+    wmo = FFMC_COEFFICIENT * (101 - ffmc_yda) / (59.5 + ffmc_yda)
+    # Eq. 2 Rain reduction to allow for loss in
+    #  overhead canopy
+    wet = prec > 0.5
+    ra = prec[wet] - 0.5
+    wmo_wet = wmo[wet]
+    # Eqs. 3a and 3b
+    rain = 42.5 * ra * np.exp(-100 / (251 - wmo_wet)) * -np.expm1(-6.93 / ra)
+    hi = wmo_wet > 150
+    rain[hi] += 0.0015 * (wmo_wet[hi] - 150) * (wmo_wet[hi] - 150) * np.sqrt(ra[hi])
+    wmo[wet] = wmo_wet + rain
+    # The real moisture content of pine litter ranges up to about 250 percent,
+    # so we cap it at 250
+    np.minimum(wmo, 250, out=wmo)
+    # rh ** 0.679 and rh ** 0.753 share one log of rh (floored so rh = 0
+    #  still gives powers of 0)
+    log_rh = np.log(np.maximum(rh, np.finfo(rh.dtype).tiny))
+    # Terms shared by Eqs. 4 and 5
+    rh_term = np.exp((rh - 100) / 10)
+    temp_term = 0.18 * (21.1 - temp) * -np.expm1(-0.115 * rh)
+    # Eq. 4 Equilibrium moisture content from drying
+    ed = np.exp(0.679 * log_rh)
+    ed *= 0.942
+    ed += 11 * rh_term
+    ed += temp_term
+    # Eq. 5 Equilibrium moisture content from wetting
+    ew = np.exp(0.753 * log_rh)
+    ew *= 0.618
+    ew += 10 * rh_term
+    ew += temp_term
+    wm = wmo.copy()
+    # Eq. 6a (ko) Log drying rate at the normal
+    #  termperature of 21.1 C
+    m = (wmo < ed) & (wmo < ew)
+    frac = (100 - rh[m]) / 100
+    z = (0.424 * (1 - (frac ** 1.7)) + 0.0694 *
+         np.sqrt(ws[m]) * (1 - _pow8(frac)))
+    # Eq. 6b Affect of temperature on  drying rate
+    x = z * 0.581 * np.exp(0.0365 * temp[m])
+    # Eq. 8, with 10 ** x as exp(x * ln(10))
+    x *= _LN10
+    wm[m] = ew[m] - (ew[m] - wmo[m]) / np.exp(x, out=x)
+    # Eq. 7a (ko) Log wetting rate at the normal
+    #  termperature of 21.1 C
+    m = wmo > ed
+    frac = rh[m] / 100
+    z = (0.424 * (1 - frac ** 1.7) + 0.0694 * np.sqrt(ws[m]) *
+         (1 - _pow8(frac)))
+    # Eq. 7b Affect of temperature on  wetting rate
+    x = z * 0.581 * np.exp(0.0365 * temp[m])
+    # Eq. 9, with 10 ** x as exp(x * ln(10))
+    x *= _LN10
+    wm[m] = ed[m] + (wmo[m] - ed[m]) / np.exp(x, out=x)
+    # Eq. 10 Final ffmc calculation
+    ffmc1 = (59.5 * (250 - wm)) / (FFMC_COEFFICIENT + wm)
+    # Constraints, with the moisture content kept consistent with them
+    np.clip(ffmc1, 0, 101, out=ffmc1)
+    np.clip(wm, 0, 250, out=wm)
+    return ffmc1.reshape(shape), wm.reshape(shape)
+
+
+def dmc_arr(dmc_yda, temp, rh, prec, lat, mon, lat_adjust=True, out=None):
+    """
+    Duff Moisture Code Calculation for arrays
+
+    Parameters
+    ----------
+    dmc_yda : array_like
+       The Duff Moisture Code from previous iteration
+    temp : array_like
+       Temperature (centigrade)
+    rh : array_like
+       Relative Humidity (%)
+    prec : array_like
+       Precipitation(mm)
+    lat : array_like
+       Latitude (decimal degrees)
+    mon : {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12}
+       Month
+    lat_adjust : bool, default=True
+       Latitude adjustment
+    out : numpy.ndarray, optional
+       Preallocated C-contiguous array of the result's shape and dtype to
+       write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Duff Moisture Code
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.dmc`, see `ffmc_arr`.
+    """
+    _check_mon(mon)
+    # a scalar lat needs only one day length factor
+    lat0 = float(lat) if np.ndim(lat) == 0 else None
+    dmc_yda, temp, rh, prec, lat = _as_arrays(dmc_yda, temp, rh, prec, lat)
+    _check_range('dmc_yda', dmc_yda, 0)
+    _check_range('rh', rh, 0, 100)
+    _check_range('prec', prec, 0)
+    if HAVE_NUMBA:
+        return _run_kernel(dmc_arr_kernel, (dmc_yda, temp, rh, prec, lat), mon, lat_adjust,
+                           out=out)
+    shape, (dmc_yda, temp, rh, prec, lat) = _flatten(dmc_yda, temp, rh, prec, lat)
+    # constrain low end of temperature
+    temp = np.maximum(temp, -1.1)
+    # Day length adjusted based on latitude and month, using a factor of 9
+    #  for all months near the equator
+    if lat0 is not None or not lat_adjust:
+        ell = _dmc_day_length(lat0, mon, lat_adjust)
+    else:
+        ell = _DMC_DAY_LENGTHS[:, mon - 1].astype(lat.dtype)[_dmc_zones(lat, lat_adjust)]
+    # Eq. 16 - The log drying rate
+    rk = 1.894 * (temp + 1.1) * (100 - rh) * ell * 1e-04
+    # Constrain P, only updating it where prec > 1.5, or is NaN as in dmc()
+    pr = dmc_yda.copy()
+    wet = ~(prec <= 1.5)
+    dmc_wet = dmc_yda[wet]
+    # Eq. 11 - Net rain amount
+    rw = 0.92 * prec[wet] - 1.27
+    # Alteration to Eq. 12 to calculate more accurately
+    wmi = 20 + 280 / np.exp(0.023 * dmc_wet)
+    # Eqs. 13a, 13b, 13c - the log is only used above 33
+    b = 100 / (0.5 + 0.3 * dmc_wet)
+    m = dmc_wet > 33
+    log_dmc = np.log(dmc_wet[m])
+    b[m] = np.where(dmc_wet[m] <= 65, 14 - 1.3 * log_dmc, 6.2 * log_dmc - 17.2)
+    # Eq. 14 - Moisture content after rain
+    wmr = wmi + 1000 * rw / (48.77 + b * rw)
+    # Alteration to Eq. 15 to calculate more accurately
+    pr[wet] = 43.43 * (5.6348 - np.log(wmr - 20))
+    np.maximum(pr, 0, out=pr)
+    # Calculate final P (DMC)
+    return _store(np.maximum(pr + rk, 0).reshape(shape), out)
+
+
+def dc_arr(dc_yda, temp, rh, prec, lat, mon, lat_adjust=True, out=None):
+    """
+    Drought Code Calculation for arrays
+
+    Parameters
+    ----------
+    dc_yda : array_like
+       The Drought Code from previous iteration
+    temp : array_like
+       Temperature (centigrade)
+    rh : array_like
+       Relative Humidity (%)
+    prec : array_like
+       Precipitation(mm)
+    lat : array_like
+       Latitude (decimal degrees)
+    mon : {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12}
+       Month
+    lat_adjust : bool, default=True
+       Latitude adjustment
+    out : numpy.ndarray, optional
+       Preallocated C-contiguous array of the result's shape and dtype to
+       write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Drought Code
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.dc`, see `ffmc_arr`.
+    """
+    _check_mon(mon)
+    # a scalar lat needs only one day length factor
+    lat0 = float(lat) if np.ndim(lat) == 0 else None
+    dc_yda, temp, rh, prec, lat = _as_arrays(dc_yda, temp, rh, prec, lat)
+    _check_range('dc_yda', dc_yda, 0)
+    _check_range('rh', rh, 0, 100)
+    _check_range('prec', prec, 0)
+    if HAVE_NUMBA:
+        return _run_kernel(dc_arr_kernel, (dc_yda, temp, rh, prec, lat), mon, lat_adjust,
+                           out=out)
+    shape, (dc_yda, temp, rh, prec, lat) = _flatten(dc_yda, temp, rh, prec, lat)
+    # Constrain temperature
+    temp = np.maximum(temp, -2.8)
+    # Day length factor adjusted by latitude, using 1.4 for all months near
+    #  the equator
+    if lat0 is not None or not lat_adjust:
+        fl = _dc_day_length(lat0, mon, lat_adjust)
+    else:
+        fl = _DC_DAY_LENGTHS[:, mon - 1].astype(lat.dtype)[_dc_zones(lat, lat_adjust)]
+    # Eq. 22 - Potential Evapotranspiration
+    pe = (0.36 * (temp + 2.8) + fl) / 2
+    # Cap potential evapotranspiration at 0 for negative winter DC values
+    pe = np.maximum(pe, 0)
+    # if precip is less than 2.8 then use yesterday's DC
+    dr = dc_yda.copy()
+    wet = prec > 2.8
+    dc_wet = dc_yda[wet]
+    # Eq. 18 - Effective Rainfall
+    rw = 0.83 * prec[wet] - 1.27
+    # Eq. 19
+    smi = 800 * np.exp(-dc_wet / 400)
+    # Alteration to Eq. 21
+    dr[wet] = np.maximum(dc_wet - 400 * np.log1p(3.937 * rw / smi), 0)
+    # Alteration to Eq. 23
+    return _store(np.maximum(dr + pe, 0).reshape(shape), out)
+
+
+def isi_arr(ffmc, ws, fbp_mod=False, out=None):
+    """
+    Initial Spread Index Calculation for arrays
+
+    Parameters
+    ----------
+    ffmc : array_like
+       Fine Fuel Moisture Code
+    ws : array_like
+       Wind Speed (km/h)
+    fbp_mod : bool, default=False
+       Use the fbp modification at the extreme end
+    out : numpy.ndarray, optional
+       Preallocated C-contiguous array of the result's shape and dtype to
+       write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Intial Spread Index
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.isi`, see `ffmc_arr`.
+    """
+    ffmc, ws = _as_arrays(ffmc, ws)
+    _check_range('ffmc', ffmc, 0, 101)
+    _check_range('ws', ws, 0)
+    if HAVE_NUMBA:
+        return _run_kernel(isi_arr_kernel, (ffmc, ws), bool(fbp_mod), out=out)
+    # Eq. 10 - Moisture content
+    fm = FFMC_COEFFICIENT * (101 - ffmc) / (59.5 + ffmc)
+    return _store(_isi_from_moisture(fm, ws, fbp_mod), out)
+
+
+def _isi_from_moisture(fm, ws, fbp_mod):
+    # NumPy body of isi_arr from the moisture content, see _ffmc_moisture
+    shape, (fm, ws) = _flatten(fm, ws)
+    # Eq. 24 - Wind Effect
+    fW = np.exp(0.05039 * ws)
+    if fbp_mod:
+        # This modification is Equation 53a in FCFDG (1992), only evaluated
+        #  for the usually few pixels with ws >= 40
+        m = ws >= 40
+        fW[m] = -12 * np.expm1(-0.0818 * (ws[m] - 28))
+    # Eq. 25 - Fine Fuel Moisture
+    fF = 91.9 * np.exp(-0.1386 * fm) * (1 + (fm ** 5.31) / 49300000)
+    # Eq. 26 - Spread Index Equation
+    return (0.208 * fW * fF).reshape(shape)
+
+
+def bui_arr(dmc, dc, out=None):
+    """
+    Buildup Index Calculation for arrays
+
+    Parameters
+    ----------
+    dmc : array_like
+       Duff Moisture Code
+    dc : array_like
+       Drought Code
+    out : numpy.ndarray, optional
+       Preallocated C-contiguous array of the result's shape and dtype to
+       write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Buildup Index
+
+    Notes
+    -----
+    Same as `cffdrs.buildup_index_raster.buildup_index`, with the argument
+    order of `cffdrs.fwi.bui`.
+    """
+    return buildup_index(dc, dmc, out=out)
+
+
+def fwi_arr(isi, bui, out=None):
+    """
+    Fire Weather Index Calculation for arrays
+
+    Parameters
+    ----------
+    isi : array_like
+        Initial Spread Index
+    bui : array_like
+        Buildup Index
+    out : numpy.ndarray, optional
+        Preallocated C-contiguous array of the result's shape and dtype to
+        write into, e.g. reused from day to day
+
+    Returns
+    -------
+    numpy.ndarray
+        Fire Weather Index
+
+    Notes
+    -----
+    Elementwise equivalent of `cffdrs.fwi.fwi`, see `ffmc_arr`.
+    """
+    isi, bui = _as_arrays(isi, bui)
+    _check_range('isi', isi, 0)
+    _check_range('bui', bui, 0)
+    if HAVE_NUMBA:
+        return _run_kernel(fwi_arr_kernel, (isi, bui), out=out)
+    # Eqs. 28b, 28a, 29
+    bb = np.where(bui > 80, 0.1 * isi * (1000 / (25 + 108.64 / np.exp(0.023 * bui))),
+                  0.1 * isi * (0.626 * (bui ** 0.809) + 2))
+    # Eqs. 30b, 30a - the log is only used above 1
+    log_bb = np.log(np.maximum(bb, 1.0))
+    return _store(np.where(bb <= 1.0, bb, np.exp(2.72 * ((0.434 * log_bb) ** 0.647))), out)
+
+
+def hourly_fine_fuel_moisture_code_arr(temp, rh, ws, prec, fo=85, t0=1):
+    """
+    Hourly Fine Fuel Moisture Code Calculation for arrays
+
+    Parameters
+    ----------
+    temp : array_like
+        Temperature (centigrade)
+    rh : array_like
+        Relative Humidity (%)
+    ws : array_like
+        Wind speed (km/h)
+    prec : array_like
+        Precipitation (mm)
+    fo : array_like, default=85
+        FFMC at the previous time step
+    t0 : array_like, default=1
+        Time (in hours) between the previous value of FFMC and the current time
+
+    Returns
+    -------
+    numpy.ndarray
+        Fine Fuel Moisture Code
+
+    Notes
+    -----
+    Elementwise equivalent of
+    `cffdrs.hourly_fine_fuel_moisture_code.hourly_fine_fuel_moisture_code`,
+    e.g. for every station of a network at one time step. With numba it is a
+    compiled ufunc, run on multiple threads, or a GPU kernel with the
+    CFFDRS_TARGET=cuda environment variable set.
+    """
+    temp, rh, ws, prec, fo, t0 = _as_arrays(temp, rh, ws, prec, fo, t0)
+    _check_range('rh', rh, 0, 100)
+    _check_range('prec', prec, 0)
+    _check_range('ws', ws, 0)
+    if ufunc_target() == 'cuda':
+        from cffdrs._cuda_kernels import device_hffmc
+        # in float64 like the ufunc, rounding only the result
+        shape, inputs = _flatten(temp, rh, ws, prec, fo, t0)
+        inputs = [np.ascontiguousarray(a, dtype=np.float64) for a in inputs]
+        ffmc = device_hffmc(inputs, np.empty_like(inputs[0])).reshape(shape)
+        return ffmc.astype(temp.dtype, copy=False)
+    return get_ufunc('hffmc')(temp, rh, ws, prec, fo, t0).astype(temp.dtype, copy=False)
@@ -0,0 +1,312 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from cffdrs._numba_kernels import (HAVE_NUMBA, dc_series_kernel, dmc_series_kernel,
+                                   ffmc_series_kernel, fwi_all_kernel, ufunc_target)
+from cffdrs.buildup_index_raster import _check_range, _float_dtype
+from cffdrs.fwi_numpy import (_DC_DAY_LENGTHS, _DMC_DAY_LENGTHS, _check_mon, _dc_zones,
+                              _dmc_zones, _ffmc_moisture, _isi_from_moisture, bui_arr, dc_arr,
+                              dmc_arr, fwi_arr)
+
+# Pixels per block when fwi_all runs on the NumPy array functions, few enough
+#  that a block's inputs and temporaries stay in cache through all six codes
+_TILE = 16384
+
+
+class FWIState(NamedTuple):
+    """
+    Fire Weather Index System values for every pixel of a raster
+
+    Each code is stored as its own contiguous float64 or float32 array
+    (structure of arrays) rather than one record array, so kernels walking
+    the pixels do unit stride loads on every field.
+    """
+    ffmc: np.ndarray
+    dmc: np.ndarray
+    dc: np.ndarray
+    isi: np.ndarray
+    bui: np.ndarray
+    fwi: np.ndarray
+
+    @classmethod
+    def empty(cls, shape, dtype=np.float64, alignment=64):
+        """Allocate uninitialized, aligned arrays of the given shape"""
+        return cls(*[_aligned_empty(shape, dtype, alignment) for _ in cls._fields])
+
+
+def _aligned_empty(shape, dtype, alignment):
+    # over-allocate and slice so the data starts on an alignment boundary
+    n = int(np.prod(shape))
+    itemsize = np.dtype(dtype).itemsize
+    buf = np.empty(n + alignment // itemsize, dtype=dtype)
+    offset = (-buf.ctypes.data % alignment) // itemsize
+    return buf[offset:offset + n].reshape(shape)
+
+
+def _daily_inputs(*arrays):
+    # broadcast weather to a common (days, ...) shape and flatten the spatial axes
+    arrays = np.broadcast_arrays(*[np.asarray(a, dtype=np.float64) for a in arrays])
+    shape = arrays[0].shape
+    if len(shape) < 1:
+        raise ValueError('Weather inputs need a leading time axis')
+    return shape, [np.ascontiguousarray(a.reshape(shape[0], -1)) for a in arrays]
+
+
+def _pixel_inputs(arr, shape):
+    # broadcast a per pixel value to the flattened spatial axes of shape
+    arr = np.broadcast_to(np.asarray(arr, dtype=np.float64), shape[1:])
+    return np.ascontiguousarray(arr.reshape(-1))
+
+
+def _month_inputs(mon, shape):
+    mon = np.broadcast_to(np.asarray(mon), shape[:1])
+    if not np.issubdtype(mon.dtype, np.integer):
+        raise ValueError(f'Invalid mon: needs integers, not {mon.dtype}')
+    _check_range('mon', mon, 1, 12)
+    return np.ascontiguousarray(mon, dtype=np.int64)
+
+
+def _check_rh_prec(rh, prec):
+    _check_range('rh', rh, 0, 100)
+    _check_range('prec', prec, 0)
+
+
+def ffmc_series(ffmc0, temp, rh, ws, prec):
+    """
+    Fine Fuel Moisture Code Calculation over a time series
+
+    Parameters
+    ----------
+    ffmc0 : array_like
+        The Fine Fuel Moisture Code before the first day, per pixel
+    temp : array_like
+        Temperature (centigrade), with time as the first axis
+    rh : array_like
+        Relative Humidity (%), with time as the first axis
+    ws : array_like
+        Wind speed (km/h), with time as the first axis
+    prec : array_like
+        Precipitation (mm), with time as the first axis
+
+    Returns
+    -------
+    numpy.ndarray
+        Fine Fuel Moisture Code for every day and pixel
+
+    Notes
+    -----
+    Applies `cffdrs.fwi.ffmc` to each pixel day by day, carrying the result
+    forward as the next day's ffmc_yda. Inputs are validated once for the
+    whole series, and the iteration runs in a compiled kernel over pixels in
+    parallel when numba is installed. With the CFFDRS_TARGET=cuda environment
+    variable set, it runs on the GPU instead, keeping the state there between
+    days.
+    """
+    shape, (temp, rh, ws, prec) = _daily_inputs(temp, rh, ws, prec)
+    ffmc0 = _pixel_inputs(ffmc0, shape)
+    _check_range('ffmc0', ffmc0, 0, 101)
+    _check_rh_prec(rh, prec)
+    _check_range('ws', ws, 0)
+    out = np.empty_like(temp)
+    if ufunc_target() == 'cuda':
+        from cffdrs._cuda_kernels import device_series, ffmc_device_kernel
+        device_series(ffmc_device_kernel, ffmc0, (temp, rh, ws, prec), out)
+    else:
+        ffmc_series_kernel(ffmc0, temp, rh, ws, prec, out)
+    return out.reshape(shape)
+
+
+def dmc_series(dmc0, temp, rh, prec, lat, mon, lat_adjust=True):
+    """
+    Duff Moisture Code Calculation over a time series
+
+    Parameters
+    ----------
+    dmc0 : array_like
+       The Duff Moisture Code before the first day, per pixel
+    temp : array_like
+       Temperature (centigrade), with time as the first axis
+    rh : array_like
+       Relative Humidity (%), with time as the first axis
+    prec : array_like
+       Precipitation (mm), with time as the first axis
+    lat : array_like
+       Latitude (decimal degrees), per pixel
+    mon : array_like of int
+       Month of each day
+    lat_adjust : bool, default=True
+       Latitude adjustment
+
+    Returns
+    -------
+    numpy.ndarray
+        Duff Moisture Code for every day and pixel
+
+    Notes
+    -----
+    Applies `cffdrs.fwi.dmc` to each pixel day by day, see `ffmc_series`.
+    """
+    shape, (temp, rh, prec) = _daily_inputs(temp, rh, prec)
+    dmc0 = _pixel_inputs(dmc0, shape)
+    lat = _pixel_inputs(lat, shape)
+    mon = _month_inputs(mon, shape)
+    _check_range('dmc0', dmc0, 0)
+    _check_rh_prec(rh, prec)
+    out = np.empty_like(temp)
+    if ufunc_target() == 'cuda':
+        from cffdrs._cuda_kernels import device_series, dmc_device_kernel
+        device_series(dmc_device_kernel, dmc0, (temp, rh, prec), out, lat, mon, lat_adjust)
+    else:
+        dmc_series_kernel(dmc0, temp, rh, prec, _dmc_zones(lat, lat_adjust), mon,
+                          _DMC_DAY_LENGTHS, out)
+    return out.reshape(shape)
+
+
+def dc_series(dc0, temp, rh, prec, lat, mon, lat_adjust=True):
+    """
+    Drought Code Calculation over a time series
+
+    Parameters
+    ----------
+    dc0 : array_like
+       The Drought Code before the first day, per pixel
+    temp : array_like
+       Temperature (centigrade), with time as the first axis
+    rh : array_like
+       Relative Humidity (%), with time as the first axis
+    prec : array_like
+       Precipitation (mm), with time as the first axis
+    lat : array_like
+       Latitude (decimal degrees), per pixel
+    mon : array_like of int
+       Month of each day
+    lat_adjust : bool, default=True
+       Latitude adjustment
+
+    Returns
+    -------
+    numpy.ndarray
+        Drought Code for every day and pixel
+
+    Notes
+    -----
+    Applies `cffdrs.fwi.dc` to each pixel day by day, see `ffmc_series`.
+    """
+    shape, (temp, rh, prec) = _daily_inputs(temp, rh, prec)
+    dc0 = _pixel_inputs(dc0, shape)
+    lat = _pixel_inputs(lat, shape)
+    mon = _month_inputs(mon, shape)
+    _check_range('dc0', dc0, 0)
+    _check_rh_prec(rh, prec)
+    out = np.empty_like(temp)
+    if ufunc_target() == 'cuda':
+        from cffdrs._cuda_kernels import dc_device_kernel, device_series
+        device_series(dc_device_kernel, dc0, (temp, rh, prec), out, lat, mon, lat_adjust)
+    else:
+        dc_series_kernel(dc0, temp, rh, prec, _dc_zones(lat, lat_adjust), mon,
+                         _DC_DAY_LENGTHS, out)
+    return out.reshape(shape)
+
+
+def _fwi_all_tiled(inputs, mon, lat_adjust, outputs, tile=_TILE):
+    # fwi_all_kernel without numba, as the fwi_numpy.py array functions run
+    #  block by block over the flat, validated arrays. ISI starts from the
+    #  moisture content left by the FFMC rather than converting it back.
+    ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat = inputs
+    for start in range(0, temp.shape[0], tile):
+        s = slice(start, start + tile)
+        ffmc1, fm = _ffmc_moisture(ffmc_yda[s], temp[s], rh[s], ws[s], prec[s])
+        dmc1 = dmc_arr(dmc_yda[s], temp[s], rh[s], prec[s], lat[s], mon, lat_adjust)
+        dc1 = dc_arr(dc_yda[s], temp[s], rh[s], prec[s], lat[s], mon, lat_adjust)
+        isi1 = _isi_from_moisture(fm, ws[s], False)
+        bui1 = bui_arr(dmc1, dc1)
+        for out, value in zip(outputs, (ffmc1, dmc1, dc1, isi1, bui1, fwi_arr(isi1, bui1))):
+            out[s] = value
+    return outputs
+
+
+def fwi_all(ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat, mon, lat_adjust=True,
+            out=None, dtype=None):
+    """
+    Fire Weather Index System Calculation for one day
+
+    Parameters
+    ----------
+    ffmc_yda : array_like
+        The Fine Fuel Moisture Code from the previous day
+    dmc_yda : array_like
+        The Duff Moisture Code from the previous day
+    dc_yda : array_like
+        The Drought Code from the previous day
+    temp : array_like
+        Temperature (centigrade)
+    rh : array_like
+        Relative Humidity (%)
+    ws : array_like
+        Wind speed (km/h)
+    prec : array_like
+        Precipitation (mm)
+    lat : array_like
+        Latitude (decimal degrees)
+    mon : {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12}
+        Month
+    lat_adjust : bool, default=True
+        Latitude adjustment
+    out : FWIState, optional
+        Preallocated C-contiguous arrays of the input shape to write into.
+        These may be the arrays the previous day's codes are read from.
+    dtype : {None, numpy.float64, numpy.float32}, default=None
+        Precision of the input and output arrays. float32 halves the memory
+        traffic on large rasters, with relative errors well below 1e-4. By
+        default it is float32 when every array input fits in it, as in
+        `cffdrs.fwi_numpy`, and float64 otherwise.
+
+    Returns
+    -------
+    FWIState
+        Fine Fuel Moisture Code, Duff Moisture Code, Drought Code,
+        Initial Spread Index, Buildup Index and Fire Weather Index
+
+    Notes
+    -----
+    Computes `cffdrs.fwi.ffmc`, `dmc`, `dc`, `isi`, `bui` and `fwi` for every
+    pixel. FFMC is computed first, separately for pixels with and without
+    rain, and the other codes then follow in a single fused pass, so their
+    intermediates are never written out and read back as separate arrays.
+    With the CFFDRS_TARGET=cuda environment variable set, the whole
+    calculation runs on the GPU instead, one thread per pixel. The arrays
+    are then copied to and from the GPU on every call, so for many days the
+    `ffmc_series`, `dmc_series` and `dc_series` functions, which keep their
+    state there, transfer far less. Without numba, the `cffdrs.fwi_numpy`
+    array functions run in turn over blocks of pixels small enough to stay
+    in cache.
+    """
+    inputs = (ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat)
+    dtype = np.dtype(_float_dtype(*inputs) if dtype is None else dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f'Invalid dtype: {dtype}')
+    arrays = np.broadcast_arrays(*[np.asarray(a, dtype=dtype) for a in inputs])
+    shape = arrays[0].shape
+    ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat = [
+        np.ascontiguousarray(a.reshape(-1)) for a in arrays]
+    _check_mon(mon)
+    _check_range('ffmc_yda', ffmc_yda, 0, 101)
+    _check_range('dmc_yda', dmc_yda, 0)
+    _check_range('dc_yda', dc_yda, 0)
+    _check_rh_prec(rh, prec)
+    _check_range('ws', ws, 0)
+    if out is None:
+        out = FWIState.empty(shape, dtype)
+    for name, arr in zip(out._fields, out):
+        if arr.shape != shape or arr.dtype != dtype or not arr.flags['C_CONTIGUOUS']:
+            raise ValueError(f'Invalid out.{name}: needs C-contiguous {dtype} of shape {shape}')
+    inputs = (ffmc_yda, dmc_yda, dc_yda, temp, rh, ws, prec, lat)
+    if ufunc_target() == 'cuda':
+        from cffdrs._cuda_kernels import device_fwi_all
+        device_fwi_all(inputs, mon, lat_adjust, [a.reshape(-1) for a in out])
+    elif not HAVE_NUMBA:
+        _fwi_all_tiled(inputs, mon, lat_adjust, [a.reshape(-1) for a in out])
+    else:
+        fwi_all_kernel(*inputs, mon, lat_adjust, *[a.reshape(-1) for a in out])
+    return out
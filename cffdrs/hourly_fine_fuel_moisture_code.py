@@ -1,7 +1,55 @@
-from math import exp
+from math import exp, expm1
 from cffdrs.fwi import FFMC_COEFFICIENT
 
 
+def _hourly_fine_fuel_moisture_code_unchecked(temp, rh, ws, prec, fo, t0):
+    # hourly_fine_fuel_moisture_code() without input validation, for callers
+    # that validate up front
+    # Eq. 1 (with a more precise multiplier than the daily)
+    mo = FFMC_COEFFICIENT * (101 - fo) / (59.5 + fo)
+    rf = prec
+    # Eqs. 3a & 3b (Van Wagner & Pickett 1985), only when it rained
+    if prec > 0.0:
+        mr = mo + 42.5 * rf * exp(-100 / (251 - mo)) * -expm1(-6.93 / rf)
+        if mo > 150:
+            mr += 0.0015 * ((mo - 150) ** 2) * (rf**0.5)
+        # The real moisture content of pine litter ranges up to about 250
+        # percent, so we cap it at 250
+        mo = min(mr, 250)
+    # Eq. 2a Equilibrium moisture content from drying
+    ed = (
+        0.942 * (rh**0.679)
+        + 11 * exp((rh - 100) / 10)
+        + 0.18 * (21.1 - temp) * -expm1(-0.115 * rh)
+    )
+    # Eq. 3a Log drying rate at the normal temperature of 21.1C
+    ko = 0.424 * (1 - (rh / 100) ** 1.7) + 0.0694 * (ws**0.5) * (1 - (rh / 100) ** 8)
+    # Eq. 3b
+    kd = ko * 0.0579 * exp(0.0365 * temp)
+    # Eq. 8 (Van Wagner & Pickett 1985)
+    md = ed + (mo - ed) * (10 ** (-kd * t0))
+    # Eq. 2b Equilibrium moisture content from wetting
+    ew = (
+        0.618 * (rh**0.753)
+        + 10 * exp((rh - 100) / 10)
+        + 0.18 * (21.1 - temp) * -expm1(-0.115 * rh)
+    )
+    # Eq. 7a Log wetting rate at the normal temperature of 21.1 C
+    k1 = 0.424 * (1 - ((100 - rh) / 100) ** 1.7) + 0.0694 * (ws**0.5) * (
+        1 - ((100 - rh) / 100) ** 8
+    )
+    # Eq. 4b
+    kw = k1 * 0.0579 * exp(0.0365 * temp)
+    # Eq. 8 (Van Wagner & Pickett 1985)
+    mw = ew - (ew - mo) * (10 ** (-kw * t0))
+    # Constraints: drying above ed, wetting below ew, unchanged in between
+    m = md if mo > ed else (mo if mo >= ew else mw)
+    # Eq. 6 - Final hffmc calculation
+    fo = 59.5 * (250 - m) / (FFMC_COEFFICIENT + m)
+    fo = max(fo, 0)
+    return fo
+
+
 def hourly_fine_fuel_moisture_code(temp, rh, ws, prec, fo=85, t0=1):
     """
     Hourly Fine Fuel Moisture Code Calculation
@@ -61,56 +109,4 @@ def hourly_fine_fuel_moisture_code(temp, rh, ws, prec, fo=85, t0=1):
         raise ValueError(f"Invalid prec: {prec}")
     if ws < 0:
         raise ValueError(f"Invalid ws: {ws}")
-    # Eq. 1 (with a more precise multiplier than the daily)
-    mo = FFMC_COEFFICIENT * (101 - fo) / (59.5 + fo)
-    rf = prec
-    # Eqs. 3a & 3b (Van Wagner & Pickett 1985)
-    if mo <= 150:
-        mr = mo + 42.5 * rf * exp(-100 / (251 - mo)) * (1 - exp(-6.93 / rf))
-    else:
-        mr = (
-            mo
-            + 42.5 * rf * exp(-100 / (251 - mo)) * (1 - exp(-6.93 / rf))
-            + 0.0015 * ((mo - 150) ** 2) * (rf**0.5)
-        )
-    # The real moisture content of pine litter ranges up to about 250 percent,
-    # so we cap it at 250
-    mr = min(mr, 250)
-    mo = mr if prec > 0.0 else mo
-    # Eq. 2a Equilibrium moisture content from drying
-    ed = (
-        0.942 * (rh**0.679)
-        + 11 * exp((rh - 100) / 10)
-        + 0.18 * (21.1 - temp) * (1 - exp(-0.115 * rh))
-    )
-    # Eq. 3a Log drying rate at the normal temperature of 21.1C
-    ko = 0.424 * (1 - (rh / 100) ** 1.7) + 0.0694 * (ws**0.5) * (1 - (rh / 100) ** 8)
-    # Eq. 3b
-    kd = ko * 0.0579 * exp(0.0365 * temp)
-    # Eq. 8 (Van Wagner & Pickett 1985)
-    md = ed + (mo - ed) * (10 ** (-kd * t0))
-    # Eq. 2b Equilibrium moisture content from wetting
-    ew = (
-        0.618 * (rh**0.753)
-        + 10 * exp((rh - 100) / 10)
-        + 0.18 * (21.1 - temp) * (1 - exp(-0.115 * rh))
-    )
-    # Eq. 7a Log wetting rate at the normal temperature of 21.1 C
-    k1 = 0.424 * (1 - ((100 - rh) / 100) ** 1.7) + 0.0694 * (ws**0.5) * (
-        1 - ((100 - rh) / 100) ** 8
-    )
-    # Eq. 4b
-    kw = k1 * 0.0579 * exp(0.0365 * temp)
-    # Eq. 8 (Van Wagner & Pickett 1985)
-    mw = ew - (ew - mo) * (10 ** (-kw * t0))
-    # Constraints
-    if mo > ed:
-        m = md
-    elif ed >= mo >= ew:
-        m = mo
-    else:
-        m = mw
-    # Eq. 6 - Final hffmc calculation
-    fo = 59.5 * (250 - m) / (FFMC_COEFFICIENT + m)
-    fo = max(fo, 0)
-    return fo
+    return _hourly_fine_fuel_moisture_code_unchecked(temp, rh, ws, prec, fo, t0)
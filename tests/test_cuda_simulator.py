@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip('numba')
+
+# Runs in a fresh interpreter, since numba reads NUMBA_ENABLE_CUDASIM on import
+_SCRIPT = textwrap.dedent('''
+    import os
+
+    import numpy as np
+
+    from cffdrs.fwi_numpy import hourly_fine_fuel_moisture_code_arr
+    from cffdrs.fwi_series import dc_series, dmc_series, ffmc_series, fwi_all
+
+    rng = np.random.default_rng(0)
+    days, n = 3, 70
+    temp = rng.uniform(-10, 35, (days, n))
+    rh = rng.uniform(0, 100, (days, n))
+    ws = rng.uniform(0, 60, (days, n))
+    prec = rng.exponential(3, (days, n)) * (rng.random((days, n)) < 0.5)
+    lat = rng.uniform(-80, 80, n)
+    calls = [
+        (ffmc_series, (rng.uniform(0, 101, n), temp, rh, ws, prec)),
+        (dmc_series, (rng.uniform(0, 300, n), temp, rh, prec, lat, [1, 6, 12])),
+        (dc_series, (rng.uniform(0, 900, n), temp, rh, prec, lat, [1, 6, 12])),
+        (fwi_all, (rng.uniform(0, 101, n), rng.uniform(0, 300, n), rng.uniform(0, 900, n),
+                   temp[0], rh[0], ws[0], prec[0], lat, 7)),
+        (hourly_fine_fuel_moisture_code_arr, (temp, rh, ws, prec, rng.uniform(0, 101, n))),
+        (hourly_fine_fuel_moisture_code_arr,
+         tuple(a[0].astype(np.float32) for a in (temp, rh, ws, prec))),
+    ]
+    device = [f(*args) for f, args in calls]
+    os.environ['CFFDRS_TARGET'] = ''
+    for got, (f, args) in zip(device, calls):
+        np.testing.assert_allclose(got, f(*args), rtol=1e-12, atol=1e-12, err_msg=f.__name__)
+''')
+
+
+def test_cuda_target_on_simulator():
+    env = dict(os.environ, NUMBA_ENABLE_CUDASIM='1', CFFDRS_TARGET='cuda')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-c', _SCRIPT], env=env, capture_output=True,
+                            text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,277 @@
+import importlib
+import itertools
+import sys
+
+import numpy as np
+import pytest
+
+# cffdrs.fwi as a module; `from cffdrs import fwi` is the fwi() function
+fwi = importlib.import_module('cffdrs.fwi')
+
+try:
+    import numba  # noqa: F401
+    _BACKENDS = ['numba', 'python']
+except ImportError:
+    _BACKENDS = ['python']
+
+RTOL = 1e-10
+ATOL = 1e-10
+
+
+@pytest.fixture(scope='module', params=_BACKENDS)
+def cffdrs(request):
+    # The array modules, imported with numba or, for 'python', afresh with numba
+    #  blocked so that they take their plain python and NumPy fallbacks
+    if request.param == 'numba':
+        yield _import()
+        return
+    saved = {name: module for name, module in sys.modules.items()
+             if name == 'cffdrs' or name.startswith('cffdrs.')}
+    numba_module = sys.modules.get('numba')
+    for name in saved:
+        del sys.modules[name]
+    sys.modules['numba'] = None
+    try:
+        modules = _import()
+        assert not modules.fwi_numpy.HAVE_NUMBA
+        yield modules
+    finally:
+        for name in [name for name in sys.modules
+                     if name == 'cffdrs' or name.startswith('cffdrs.')]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+        if numba_module is None:
+            del sys.modules['numba']
+        else:
+            sys.modules['numba'] = numba_module
+
+
+class _Modules:
+    def __init__(self, **modules):
+        self.__dict__.update(modules)
+
+
+def _import():
+    return _Modules(fwi_numpy=importlib.import_module('cffdrs.fwi_numpy'),
+                    fwi_series=importlib.import_module('cffdrs.fwi_series'),
+                    buildup_index_raster=importlib.import_module('cffdrs.buildup_index_raster'))
+
+
+def _scalar(func, *args, **kwargs):
+    # func from cffdrs.fwi applied to each element of the broadcast args
+    with np.errstate(invalid='ignore'):
+        return np.vectorize(lambda *a: func(*a, **kwargs), otypes=[np.float64])(*args)
+
+
+def _random_grid(n=2000, nan=False, seed=42):
+    rng = np.random.default_rng(seed)
+    grid = {
+        'ffmc': rng.uniform(0, 101, n),
+        'dmc': rng.uniform(0, 300, n),
+        'dc': rng.uniform(0, 900, n),
+        'temp': rng.uniform(-15, 40, n),
+        'rh': rng.uniform(0, 100, n),
+        'ws': rng.uniform(0, 60, n),
+        'prec': rng.exponential(3, n) * (rng.random(n) < 0.5),
+        'lat': rng.uniform(-90, 90, n),
+    }
+    if nan:
+        for arr in grid.values():
+            arr[rng.choice(n, n // 50, replace=False)] = np.nan
+    return grid
+
+
+def _boundary_grid():
+    # Every combination of the thresholds in the calculations, for temp,
+    #  prec and lat, with the other inputs cycling through their extremes
+    temp, prec, lat = map(np.array, zip(*itertools.product(
+        [-15, -2.8, -1.1, 0, 1.1, 2.8, 40],
+        [0, 0.5, 0.6, 1.5, 1.6, 2.8, 2.9, 50],
+        [-90, -30, -20, -10, 0, 10, 20, 30, 45, 90])))
+    n = temp.size
+    return {
+        'ffmc': np.resize([0, 101, 85, 59.5, 99.9], n),
+        'dmc': np.resize([0, 0.5, 33, 300], n),
+        'dc': np.resize([0, 2, 400, 900], n),
+        'temp': temp.astype(np.float64),
+        'rh': np.resize([0, 100, 45, 99.9, 0.1], n).astype(np.float64),
+        'ws': np.resize([0, 60, 12], n).astype(np.float64),
+        'prec': prec.astype(np.float64),
+        'lat': lat.astype(np.float64),
+    }
+
+
+GRIDS = {
+    'random': _random_grid(),
+    'boundary': _boundary_grid(),
+    'nan': _random_grid(nan=True),
+}
+
+
+@pytest.fixture(params=sorted(GRIDS))
+def grid(request):
+    return GRIDS[request.param]
+
+
+def test_ffmc_arr(cffdrs, grid):
+    g = grid
+    expected = _scalar(fwi.ffmc, g['ffmc'], g['temp'], g['rh'], g['ws'], g['prec'])
+    got = cffdrs.fwi_numpy.ffmc_arr(g['ffmc'], g['temp'], g['rh'], g['ws'], g['prec'])
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('mon', [1, 4, 7, 12])
+@pytest.mark.parametrize('lat_adjust', [True, False])
+def test_dmc_arr(cffdrs, grid, mon, lat_adjust):
+    g = grid
+    args = (g['dmc'], g['temp'], g['rh'], g['prec'], g['lat'])
+    expected = _scalar(fwi.dmc, *args, mon=mon, lat_adjust=lat_adjust)
+    got = cffdrs.fwi_numpy.dmc_arr(*args, mon, lat_adjust)
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('mon', [1, 4, 7, 12])
+@pytest.mark.parametrize('lat_adjust', [True, False])
+def test_dc_arr(cffdrs, grid, mon, lat_adjust):
+    g = grid
+    args = (g['dc'], g['temp'], g['rh'], g['prec'], g['lat'])
+    expected = _scalar(fwi.dc, *args, mon=mon, lat_adjust=lat_adjust)
+    got = cffdrs.fwi_numpy.dc_arr(*args, mon, lat_adjust)
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('fbp_mod', [False, True])
+def test_isi_arr(cffdrs, grid, fbp_mod):
+    expected = _scalar(fwi.isi, grid['ffmc'], grid['ws'], fbp_mod=fbp_mod)
+    got = cffdrs.fwi_numpy.isi_arr(grid['ffmc'], grid['ws'], fbp_mod)
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+def test_bui(cffdrs, grid):
+    expected = _scalar(fwi.bui, grid['dmc'], grid['dc'])
+    np.testing.assert_allclose(cffdrs.fwi_numpy.bui_arr(grid['dmc'], grid['dc']), expected,
+                               rtol=RTOL, atol=ATOL)
+    np.testing.assert_allclose(cffdrs.buildup_index_raster.buildup_index(grid['dc'], grid['dmc']),
+                               expected, rtol=RTOL, atol=ATOL)
+
+
+def test_fwi_arr(cffdrs, grid):
+    isi = grid['ws'] / 2
+    expected = _scalar(fwi.fwi, isi, grid['dmc'])
+    got = cffdrs.fwi_numpy.fwi_arr(isi, grid['dmc'])
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+def test_hourly_fine_fuel_moisture_code_arr(cffdrs, grid):
+    from cffdrs.hourly_fine_fuel_moisture_code import hourly_fine_fuel_moisture_code
+    g = grid
+    args = (g['temp'], g['rh'], g['ws'], g['prec'], g['ffmc'])
+    expected = _scalar(hourly_fine_fuel_moisture_code, *args)
+    got = cffdrs.fwi_numpy.hourly_fine_fuel_moisture_code_arr(*args)
+    np.testing.assert_allclose(got, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('mon', [3, 7])
+def test_fwi_all(cffdrs, grid, mon):
+    g = grid
+    ffmc = _scalar(fwi.ffmc, g['ffmc'], g['temp'], g['rh'], g['ws'], g['prec'])
+    dmc = _scalar(fwi.dmc, g['dmc'], g['temp'], g['rh'], g['prec'], g['lat'], mon=mon)
+    dc = _scalar(fwi.dc, g['dc'], g['temp'], g['rh'], g['prec'], g['lat'], mon=mon)
+    isi = _scalar(fwi.isi, ffmc, g['ws'])
+    bui = _scalar(fwi.bui, dmc, dc)
+    expected = (ffmc, dmc, dc, isi, bui, _scalar(fwi.fwi, isi, bui))
+    got = cffdrs.fwi_series.fwi_all(g['ffmc'], g['dmc'], g['dc'], g['temp'], g['rh'], g['ws'],
+                                    g['prec'], g['lat'], mon)
+    for name, got_code, expected_code in zip(got._fields, got, expected):
+        np.testing.assert_allclose(got_code, expected_code, rtol=RTOL, atol=ATOL, err_msg=name)
+
+
+def test_series(cffdrs, grid):
+    # The first 200 pixels of the grid as 10 days of 20 pixels
+    g = {name: arr[:200].reshape(10, 20) for name, arr in grid.items()}
+    mon = [t % 12 + 1 for t in range(10)]
+    lat = g['lat'][0]
+    ffmc, dmc, dc = g['ffmc'][0], g['dmc'][0], g['dc'][0]
+    expected = {'ffmc': [], 'dmc': [], 'dc': []}
+    for t in range(10):
+        ffmc = _scalar(fwi.ffmc, ffmc, g['temp'][t], g['rh'][t], g['ws'][t], g['prec'][t])
+        dmc = _scalar(fwi.dmc, dmc, g['temp'][t], g['rh'][t], g['prec'][t], lat, mon=mon[t])
+        dc = _scalar(fwi.dc, dc, g['temp'][t], g['rh'][t], g['prec'][t], lat, mon=mon[t])
+        for name, code in (('ffmc', ffmc), ('dmc', dmc), ('dc', dc)):
+            expected[name].append(code)
+    series = cffdrs.fwi_series
+    got = {
+        'ffmc': series.ffmc_series(g['ffmc'][0], g['temp'], g['rh'], g['ws'], g['prec']),
+        'dmc': series.dmc_series(g['dmc'][0], g['temp'], g['rh'], g['prec'], lat, mon),
+        'dc': series.dc_series(g['dc'][0], g['temp'], g['rh'], g['prec'], lat, mon),
+    }
+    for name in expected:
+        np.testing.assert_allclose(got[name], expected[name], rtol=RTOL, atol=ATOL, err_msg=name)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_bui_mixed_zeros(cffdrs, dtype):
+    # One of dmc and dc zero, or both
+    dc = np.array([0, 0, 50, 0, 300], dtype=dtype)
+    dmc = np.array([0, 20, 0, 0.5, 0], dtype=dtype)
+    expected = _scalar(fwi.bui, dmc.astype(np.float64), dc.astype(np.float64))
+    rtol = 1e-6 if dtype == np.float32 else RTOL
+    for got in (cffdrs.buildup_index_raster.buildup_index(dc, dmc),
+                cffdrs.fwi_numpy.bui_arr(dmc, dc)):
+        assert got.dtype == dtype
+        np.testing.assert_allclose(got, expected, rtol=rtol, atol=0)
+
+
+# Values of the R cffdrs package's dcCalc and dmcCalc between the lower
+#  temperature bounds and the old +2.8 / +1.1 clamps, and at the bounds
+@pytest.mark.parametrize('args, expected', [
+    ((200, 1.0, 40, 0, 50, 7), 203.884),
+    ((100, 2.0, 40, 0, 50, 1), 100.064),
+    ((200, -5, 40, 0, 50, 7), 203.2),
+])
+def test_dc_temperature_clamp(cffdrs, args, expected):
+    assert fwi.dc(*args) == pytest.approx(expected, rel=1e-12)
+    assert cffdrs.fwi_numpy.dc_arr(*args) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('args, expected', [
+    ((20, 0.5, 40, 0, 50, 7), 20.22546176),
+    ((10, 1.0, 60, 0, 50, 1), 10.1034124),
+    ((20, -5, 40, 0, 50, 7), 20.0),
+])
+def test_dmc_temperature_clamp(cffdrs, args, expected):
+    assert fwi.dmc(*args) == pytest.approx(expected, rel=1e-12)
+    assert cffdrs.fwi_numpy.dmc_arr(*args) == pytest.approx(expected, rel=1e-12)
+
+
+# Values of the R cffdrs package's hffmc for hours without rain, which used to
+#  raise ZeroDivisionError
+@pytest.mark.parametrize('args, expected', [
+    ((20, 40, 10, 0, 85), 85.57386),
+    ((5, 90, 0, 0, 60), 60.15787),
+    ((30, 15, 25, 0, 92), 93.05059),
+])
+def test_hourly_fine_fuel_moisture_code_no_rain(cffdrs, args, expected):
+    from cffdrs.hourly_fine_fuel_moisture_code import hourly_fine_fuel_moisture_code
+    assert hourly_fine_fuel_moisture_code(*args) == pytest.approx(expected, abs=1e-5)
+    got = cffdrs.fwi_numpy.hourly_fine_fuel_moisture_code_arr(*args)
+    assert got == pytest.approx(expected, abs=1e-5)
+
+
+# A NaN pixel, e.g. nodata, must not hide an out of range one from validation
+@pytest.mark.parametrize('call', [
+    lambda m: m.fwi_numpy.ffmc_arr(85, 20, [np.nan, 150], 10, 0),
+    lambda m: m.fwi_numpy.dmc_arr(20, 20, 40, [np.nan, -5], 50, 7),
+    lambda m: m.fwi_numpy.dc_arr([-1, np.nan], 20, 40, 0, 50, 7),
+    lambda m: m.fwi_numpy.isi_arr(85, [np.nan, -10]),
+    lambda m: m.buildup_index_raster.buildup_index([100, 100], [np.nan, -50]),
+    lambda m: m.fwi_numpy.bui_arr([np.nan, 20], [-1, 100]),
+    lambda m: m.fwi_numpy.hourly_fine_fuel_moisture_code_arr(20, [np.nan, 101], 10, 0),
+    lambda m: m.fwi_series.fwi_all([np.nan, 500], 6, 15, 20, 40, 10, 0, 45, 7),
+    lambda m: m.fwi_series.ffmc_series(85, [[20, 20]], 40, [[np.nan, -10]], 0),
+    lambda m: m.fwi_series.dc_series([np.nan, -3], [[20, 20]], 40, 0, 50, [7]),
+])
+def test_nan_does_not_skip_validation(cffdrs, call):
+    # The message names the offending value, not the NaN
+    with pytest.raises(ValueError, match=r'Invalid \w+: -?\d'):
+        call(cffdrs)